@@ -1,81 +1,224 @@
 #!/usr/bin/env python3
 
+import itertools
+import multiprocessing
 import sys
 import time
 from datetime import datetime
 import numpy as np
-from numpy.random import MT19937, SeedSequence
+from numpy.random import SeedSequence
+
+try:
+    from solver_numba import count_solutions
+except ImportError:  # numba not installed, fall back to the Python solver
+    count_solutions = None
+
+# box index (0..8) of each cell, indexed by row*9+column
+BOX = tuple(r // 3 * 3 + c // 3 for r in range(9) for c in range(9))
+
+# a canonical solved grid; permuting its bands, stacks, rows within a
+# band, columns within a stack and relabelling the digits yields other
+# valid solved grids, uniformly over the whole permutation class
+CANONICAL_GRID = np.array([[(r * 3 + r // 3 + c) % 9 + 1 for c in range(9)]
+                           for r in range(9)], dtype=np.int8)
+
+_DIGITS = tuple(str(i) for i in range(10))
+
+_SVG_CELL_SIZE = 40
+
+
+# the grid scaffold of the SVG is identical for every board, so it is
+# rendered once at import time; to_svg() only adds the digits
+def _svg_header():
+    cell_size = _SVG_CELL_SIZE
+    stroke_color = '#222'
+    padding = cell_size // 10
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{9 * cell_size + 2 * padding}" height="{9 * cell_size + 2 * padding}" version="1.1">\n'\
+        f' <style>\n'\
+        f' text {{\n'\
+        f'  font-family: "Courier New", Courier, monospace;\n'\
+        f'  font-size: {cell_size/1.618}px;\n'\
+        f'  text-anchor: middle;\n'\
+        f'  dominant-baseline: middle;\n'\
+        f'  color: {stroke_color};\n'\
+        f'}}\n'\
+        f' </style>\n'\
+        f' <g transform="translate({padding} {padding})" stroke="{stroke_color}">'\
+        f'  <rect x="0" y="0" width="{9 * cell_size}" height="{9 * cell_size}" fill="white" />\n']
+    for i in range(10):
+        stroke_width = 2 if i % 3 == 0 else 0.5
+        parts.append(f'  <line stroke-width="{stroke_width}" x1="{i * cell_size}" y1="0" x2="{i * cell_size}" y2="{9 * cell_size}"/>\n'
+            f'  <line stroke-width="{stroke_width}" x1="0" y1="{i * cell_size}" x2="{9 * cell_size}" y2="{i * cell_size}"/>\n')
+    return ''.join(parts)
+
+
+_SVG_HEADER = _svg_header()
+_SVG_FOOTER = ' </g>\n</svg>\n'
+
+# one PCG64 instance shared by all Sudoku objects in this process,
+# seeded from OS entropy; no warmup needed
+_RNG = np.random.default_rng()
 
 class Sudoku:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.board = np.zeros((9, 9), dtype=np.int8)
-        self.rng = MT19937(SeedSequence(int(1e3*time.time())))
-        for _ in range(1000): # warmup RNG
-            self.rng.random_raw()
+        self._rebuild_masks()
+        # share the process-wide RNG unless a private seed is requested
+        self.rng = _RNG if seed is None else np.random.default_rng(seed)
 
     def reset(self):
         self.board.fill(0)
+        self._rebuild_masks()
+
+    # recompute the row/column/box bitmasks from the board;
+    # bit n-1 of a mask is set iff digit n is already used there
+    def _rebuild_masks(self):
+        self.row_mask = [0] * 9
+        self.col_mask = [0] * 9
+        self.box_mask = [0] * 9
+        for r in range(9):
+            for c in range(9):
+                n = int(self.board[r][c])
+                if n != 0:
+                    bit = 1 << (n - 1)
+                    self.row_mask[r] |= bit
+                    self.col_mask[c] |= bit
+                    self.box_mask[BOX[r * 9 + c]] |= bit
 
     def to_text(self) -> str:
-        result = ''
-        for row in self.board:
-            result += ''.join([str(x) for x in row]) + '\n'
-        return result
+        # digits 0..9 map to ASCII directly, no per-cell str() needed
+        buf = (self.board + ord('0')).astype(np.uint8)
+        return '\n'.join(buf[i].tobytes().decode('ascii') for i in range(9)) + '\n'
 
     def to_svg(self) -> str:
-        cell_size = 40
-        stroke_color = '#222'
-        padding = cell_size // 10
-        svg = f'<svg xmlns="http://www.w3.org/2000/svg" width="{9 * cell_size + 2 * padding}" height="{9 * cell_size + 2 * padding}" version="1.1">\n'\
-            f' <style>\n'\
-            f' text {{\n'\
-            f'  font-family: "Courier New", Courier, monospace;\n'\
-            f'  font-size: {cell_size/1.618}px;\n'\
-            f'  text-anchor: middle;\n'\
-            f'  dominant-baseline: middle;\n'\
-            f'  color: {stroke_color};\n'\
-            f'}}\n'\
-            f' </style>\n'\
-            f' <g transform="translate({padding} {padding})" stroke="{stroke_color}">'\
-            f'  <rect x="0" y="0" width="{9 * cell_size}" height="{9 * cell_size}" fill="white" />\n'
-        for i in range(10):
-            stroke_width = 2 if i % 3 == 0 else 0.5
-            svg += f'  <line stroke-width="{stroke_width}" x1="{i * cell_size}" y1="0" x2="{i * cell_size}" y2="{9 * cell_size}"/>\n'\
-                f'  <line stroke-width="{stroke_width}" x1="0" y1="{i * cell_size}" x2="{9 * cell_size}" y2="{i * cell_size}"/>\n'
+        cell_size = _SVG_CELL_SIZE
+        parts = [_SVG_HEADER]
+        board = self.board.tolist()  # plain ints, no NumPy scalar boxing
         for row in range(9):
             for column in range(9):
-                if self.board[row][column] != 0:
-                    svg += f'  <text x="{(column + 0.5) * cell_size}" y="{(row + 0.5) * cell_size}">{self.board[row][column]}</text>\n'
-        svg += ' </g>\n'\
-            '</svg>\n'
-        return svg
+                value = board[row][column]
+                if value != 0:
+                    parts.append(f'  <text x="{(column + 0.5) * cell_size}" y="{(row + 0.5) * cell_size}">{_DIGITS[value]}</text>\n')
+        parts.append(_SVG_FOOTER)
+        return ''.join(parts)
 
 
-    def generate(self, difficulty, timeout=None):
+    def generate(self, difficulty, timeout=None, verbose=True):
         n_tries = 0
+        target = self.min_empty_cells_for_difficulty(difficulty)
+        last_progress = 0.0
         while True:
             if timeout:
                 if time.time() > timeout:
-                    break 
+                    break
             n_tries += 1
-            print(f'\r{n_tries} ... ', end='', flush=True)
-            n = 81 - self.min_empty_cells_for_difficulty(difficulty)
-            while n > 0:
-                row = self.rng.random_raw() % 9
-                col = self.rng.random_raw() % 9
-                num = 1 + self.rng.random_raw() % 9
-                if self.number_is_valid(row, col, num):
-                    self.board[row][col] = num
-                    n -= 1
-            solutions = [solution for solution in self.solve()]
-            if len(solutions) == 1:
-                print()
+            # updating (and flushing) the progress line on every try
+            # would stall the loop on terminal I/O; 10 updates/s suffice
+            if verbose:
+                now = time.monotonic()
+                if now - last_progress > 0.1:
+                    print(f'\r{n_tries} ... ', end='', flush=True)
+                    last_progress = now
+            # start from a random fully solved grid and dig holes into
+            # it; no rejection sampling of random fills needed
+            self._random_solved_grid()
+            if self._dig_holes(target):
+                if verbose:
+                    print()
                 return True
             self.reset()
 
-        print("\rNo Sudoku found.", file=sys.stderr)
+        if verbose:
+            print("\rNo Sudoku found.", file=sys.stderr)
+        return False
+
+    # fill the board with a uniformly random member of the permutation
+    # class of CANONICAL_GRID
+    def _random_solved_grid(self):
+        rows = np.concatenate([band * 3 + self.rng.permutation(3)
+                               for band in self.rng.permutation(3)])
+        cols = np.concatenate([stack * 3 + self.rng.permutation(3)
+                               for stack in self.rng.permutation(3)])
+        digits = np.concatenate(([0], 1 + self.rng.permutation(9))).astype(np.int8)
+        self.board[:] = digits[CANONICAL_GRID[np.ix_(rows, cols)]]
+        self._rebuild_masks()
+
+    # empty cells one by one in random order, keeping only removals that
+    # leave the puzzle with a unique solution; True once n_holes cells
+    # are empty, False if no removable cell is left before that
+    def _dig_holes(self, n_holes):
+        removed = 0
+        for cell in self.rng.permutation(81).tolist():
+            r, c = divmod(cell, 9)
+            num = int(self.board[r][c])
+            bit = 1 << (num - 1)
+            b = BOX[cell]
+            self.board[r][c] = 0
+            self.row_mask[r] ^= bit
+            self.col_mask[c] ^= bit
+            self.box_mask[b] ^= bit
+            if self._has_unique_solution():
+                removed += 1
+                if removed == n_holes:
+                    return True
+            else:
+                self.board[r][c] = num
+                self.row_mask[r] |= bit
+                self.col_mask[c] |= bit
+                self.box_mask[b] |= bit
         return False
 
+    # constraint propagation on scratch masks: repeatedly fill cells
+    # that have exactly one candidate left (naked singles) until the
+    # board is complete or no cell is forced. True means the singles
+    # alone complete the board - every step was forced, so the solution
+    # is necessarily unique.
+    def _singles_solve(self):
+        row_mask = list(self.row_mask)
+        col_mask = list(self.col_mask)
+        box_mask = list(self.box_mask)
+        flat = self.board.ravel().tolist()
+        empty = [cell for cell in range(81) if flat[cell] == 0]
+        while empty:
+            kept = []
+            for cell in empty:
+                r, c = divmod(cell, 9)
+                allowed = ~(row_mask[r] | col_mask[c] | box_mask[BOX[cell]]) & 0x1FF
+                if allowed == 0:
+                    return False
+                if allowed & (allowed - 1) == 0:
+                    row_mask[r] |= allowed
+                    col_mask[c] |= allowed
+                    box_mask[BOX[cell]] |= allowed
+                else:
+                    kept.append(cell)
+            if len(kept) == len(empty):
+                return False  # propagation stalled, board under-determined
+            empty = kept
+        return True
+
+    # True iff the current board has exactly one completion
+    def _has_unique_solution(self):
+        if self._singles_solve():
+            return True
+        if count_solutions is not None:
+            return count_solutions(self.board.copy().ravel(),
+                                   np.array(self.row_mask, dtype=np.int16),
+                                   np.array(self.col_mask, dtype=np.int16),
+                                   np.array(self.box_mask, dtype=np.int16),
+                                   2) == 1
+        # a second solution already disqualifies the board, no need to
+        # enumerate the rest of the search tree
+        board_backup = self.board.copy()
+        n_solutions = 0
+        for _solution in self.solve():
+            n_solutions += 1
+            if n_solutions > 1:
+                break
+        self.board[:] = board_backup
+        self._rebuild_masks()
+        return n_solutions == 1
+
     # 1 = really easy, 3 = middle, 6 = devilish (lowest number possible, takes a long time to calculate)
     def min_empty_cells_for_difficulty(self, difficulty):
         empty_cells = [0, 25, 35, 45, 52, 58, 64]
@@ -86,35 +229,74 @@ class Sudoku:
 
     # method to print the board in console
     def print(self):
-        for i in range(9):
-            print("".join([str(x) if x != 0 else "." for x in self.board[i]]))
+        print(self.to_text().translate({ord('0'): '.'}), end='')
 
 
     def number_is_valid(self, row, column, number):
-        r = row - row % 3
-        c = column - column % 3
-        if np.any(self.board[:,column] == number) or \
-            np.any(self.board[row,:] == number) or \
-                np.any(self.board[r:r+3, c:c+3] == number):
-            return False
-        return True
+        bit = 1 << (number - 1)
+        return not ((self.row_mask[row] | self.col_mask[column] |
+                     self.box_mask[BOX[row * 9 + column]]) & bit)
 
 
     def solve(self):
-        # find an empty cell
-        for r in range(9):
-            for c in range(9):
-                if self.board[r][c] == 0:
-                    # for every empty cell fill a valid number into it
-                    for n in range(1, 10):
-                        if self.number_is_valid(r, c, n):
-                            self.board[r][c] = n
-                            # is it solved?
-                            yield from self.solve()
-                            # backtrack
-                            self.board[r][c] = 0
-                    return False
-        yield True
+        # during the search the board matrix is redundant: the three
+        # mask arrays fully determine which placements are legal, so the
+        # search state is just the masks plus a stack of placements. The
+        # board is only written when a solution surfaces (and restored
+        # once the search is exhausted).
+        flat = self.board.ravel()
+        empty = [cell for cell, n in enumerate(flat.tolist()) if n == 0]
+        placements = []
+        for solution in self._solve(empty, 0, placements):
+            for cell, n in placements:
+                flat[cell] = n  # expose the completed grid
+            yield solution
+        for cell in empty:
+            flat[cell] = 0  # search exhausted, back to the puzzle
+
+    def _solve(self, empty, i, placements):
+        if i == len(empty):
+            yield True
+            return
+        cell = empty[i]
+        r, c = divmod(cell, 9)
+        b = BOX[cell]
+        # iterate only over the digits still allowed here, extracting
+        # one candidate bit at a time
+        cand = ~(self.row_mask[r] | self.col_mask[c] | self.box_mask[b]) & 0x1FF
+        while cand:
+            bit = cand & -cand
+            cand ^= bit
+            self.row_mask[r] |= bit
+            self.col_mask[c] |= bit
+            self.box_mask[b] |= bit
+            placements.append((cell, bit.bit_length()))
+            # is it solved?
+            yield from self._solve(empty, i + 1, placements)
+            # backtrack
+            placements.pop()
+            self.row_mask[r] ^= bit
+            self.col_mask[c] ^= bit
+            self.box_mask[b] ^= bit
+        return False
+
+
+def _generate_worker(args):
+    difficulty, seed = args
+    sudoku = Sudoku(seed)
+    sudoku.generate(difficulty, verbose=False)
+    return sudoku.board
+
+
+# run one independently seeded generation attempt per worker; the first
+# board that comes back wins and the remaining workers are terminated
+def generate_parallel(difficulty):
+    seed_seq = SeedSequence()
+    with multiprocessing.Pool(multiprocessing.cpu_count()) as pool:
+        tasks = ((difficulty, seed_seq.spawn(1)[0]) for _ in itertools.count())
+        for board in pool.imap_unordered(_generate_worker, tasks, chunksize=1):
+            pool.terminate()
+            return board
 
 
 def main():
@@ -123,15 +305,15 @@ def main():
     loop_inifinitely = 'loop' in args
     sudoku = Sudoku()
     while True:
-        ok = sudoku.generate(difficulty, timeout=None)
-        if ok:
-            print()
-            sudoku.print()
-            now = datetime.now()
-            with open(f'sudoku-{now:%Y%m%dT%H%M%S}-{difficulty}.svg', 'w') as f:
-                f.write(sudoku.to_svg())
-            with open(f'sudoku-{now:%Y%m%dT%H%M%S}-{difficulty}.txt', 'w') as f:
-                f.write(sudoku.to_text())
+        sudoku.board[:] = generate_parallel(difficulty)
+        sudoku._rebuild_masks()
+        print()
+        sudoku.print()
+        now = datetime.now()
+        with open(f'sudoku-{now:%Y%m%dT%H%M%S}-{difficulty}.svg', 'w') as f:
+            f.write(sudoku.to_svg())
+        with open(f'sudoku-{now:%Y%m%dT%H%M%S}-{difficulty}.txt', 'w') as f:
+            f.write(sudoku.to_text())
         if not loop_inifinitely:
             break
         sudoku.reset()
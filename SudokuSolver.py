@@ -8,7 +8,7 @@ class Sudoku:
         
     # evaluates the difficulty of the sudoku by counting the empty spaces
     def evaluate(self):
-        empty_cells = sum(self.board, []).count(0)
+        empty_cells = sum(row.count(0) for row in self.board)
         if empty_cells <= 28:
             return "Pretty easy"
         elif empty_cells <= 39:
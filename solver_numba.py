@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from numba import njit, int8, int16, int64
+
+# lookup tables for 9-bit candidate masks: number of set bits, and the
+# digit corresponding to a single-bit mask
+_POPCOUNT = np.array([bin(i).count('1') for i in range(512)], dtype=np.int16)
+_DIGIT = np.zeros(512, dtype=np.int16)
+for _n in range(1, 10):
+    _DIGIT[1 << (_n - 1)] = _n
+
+# the 20 peers of each cell: the other cells of its row, column and box
+_PEERS = np.array([[p for p in range(81)
+                    if p != i and (p // 9 == i // 9 or p % 9 == i % 9 or
+                                   (p // 27 == i // 27 and p % 9 // 3 == i % 9 // 3))]
+                   for i in range(81)], dtype=np.int64)
+
+
+# Counts the completions of `board`, stopping as soon as `limit` solutions
+# have been found (generate() only needs to know whether there is exactly
+# one). The board and the three 9-bit constraint masks are modified in
+# place; pass copies if the caller still needs them. The recursion of the
+# Python generator solver is replaced by an explicit stack so the whole
+# search runs as one compiled loop, and each step branches on the empty
+# cell with the fewest remaining candidates (minimum remaining values),
+# iterating only over those candidates via bit tricks. Per-cell candidate
+# masks are kept incrementally: a placement only clears one bit in the 20
+# peers listed in _PEERS, and a backtrack recomputes just those cells
+# from the masks, so the MRV scan is a plain table lookup.
+@njit(int64(int8[:], int16[:], int16[:], int16[:], int64), cache=True)
+def count_solutions(board, row_mask, col_mask, box_mask, limit):
+    cells = np.empty(81, np.int64)
+    n_empty = 0
+    for cell in range(81):
+        if board[cell] == 0:
+            cells[n_empty] = cell
+            n_empty += 1
+    if n_empty == 0:
+        return 1
+    cand_flat = np.zeros(81, np.int16)  # current candidates per cell
+    for i in range(n_empty):
+        cell = cells[i]
+        r = cell // 9
+        c = cell % 9
+        cand_flat[cell] = ~(row_mask[r] | col_mask[c] |
+                            box_mask[r // 3 * 3 + c // 3]) & 0x1FF
+    placed = np.zeros(n_empty, np.int16)  # digit currently placed per depth
+    cand = np.zeros(n_empty, np.int16)    # untried candidates per depth
+    count = 0
+    depth = 0
+    fresh = True
+    while depth >= 0:
+        if fresh:
+            # most-constrained-variable: pick the remaining empty cell
+            # with the fewest candidates and swap it to this depth
+            best = depth
+            best_n = 10
+            for i in range(depth, n_empty):
+                pc = _POPCOUNT[cand_flat[cells[i]]]
+                if pc < best_n:
+                    best_n = pc
+                    best = i
+                    if pc <= 1:
+                        break
+            cells[best], cells[depth] = cells[depth], cells[best]
+            cell = cells[depth]
+            r = cell // 9
+            c = cell % 9
+            b = r // 3 * 3 + c // 3
+            cand[depth] = cand_flat[cell]
+        else:
+            # returning to this depth: remove the placement made here
+            # and restore the candidates of the affected cells
+            cell = cells[depth]
+            r = cell // 9
+            c = cell % 9
+            b = r // 3 * 3 + c // 3
+            bit = 1 << (placed[depth] - 1)
+            board[cell] = 0
+            row_mask[r] ^= bit
+            col_mask[c] ^= bit
+            box_mask[b] ^= bit
+            placed[depth] = 0
+            for j in range(20):
+                p = _PEERS[cell, j]
+                pr = p // 9
+                pcol = p % 9
+                cand_flat[p] = ~(row_mask[pr] | col_mask[pcol] |
+                                 box_mask[pr // 3 * 3 + pcol // 3]) & 0x1FF
+            cand_flat[cell] = ~(row_mask[r] | col_mask[c] | box_mask[b]) & 0x1FF
+        cm = cand[depth]
+        if cm == 0:
+            fresh = False
+            depth -= 1
+            continue
+        bit = cm & (-cm)  # lowest untried candidate
+        cand[depth] = cm ^ bit
+        n = _DIGIT[bit]
+        board[cell] = n
+        row_mask[r] |= bit
+        col_mask[c] |= bit
+        box_mask[b] |= bit
+        clear = ~bit
+        for j in range(20):
+            cand_flat[_PEERS[cell, j]] &= clear
+        placed[depth] = n
+        depth += 1
+        fresh = True
+        if depth == n_empty:
+            count += 1
+            if count >= limit:
+                return count
+            depth -= 1
+            fresh = False
+    return count